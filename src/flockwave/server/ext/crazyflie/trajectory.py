@@ -187,10 +187,10 @@ def encode_trajectory(
         result = b"".join(polynomial.encode() for polynomial in polynomials)
     else:
         encoder = SegmentEncoder(scale=1)
-        encoded = encoder.iter_encode_multiple_segments(
+        encoded = encoder.encode_multiple_segments(
             trajectory.iter_segments(max_length=65)
         )
-        result = b"".join(encoded) + b"\x00\x00\x00"
+        result = encoded + b"\x00\x00\x00"
 
     return result
 
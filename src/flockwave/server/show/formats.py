@@ -2,12 +2,12 @@
 
 from contextlib import aclosing
 from enum import IntEnum, IntFlag
-from functools import partial
-from io import BytesIO, SEEK_END
+from io import BytesIO, SEEK_END, SEEK_SET
 from math import floor
 from struct import Struct
 from trio import wrap_file
 from typing import (
+    Any,
     AsyncIterable,
     Awaitable,
     Callable,
@@ -35,6 +35,24 @@ _SKYBRUSH_BINARY_FILE_HEADER: list[bytes] = [
     b"skyb\x02\x01\x00\x00\x00\x00",
 ]
 
+_SKYBRUSH_BINARY_FILE_MAX_HEADER_LENGTH: int = max(
+    len(header) for header in _SKYBRUSH_BINARY_FILE_HEADER
+)
+"""Length of the longest possible header of a Skybrush binary file, including
+the feature flags and the CRC bytes.
+"""
+
+_CRC_CHUNK_SIZE: int = 65536
+"""Number of bytes to read from the underlying file in one go when calculating
+the CRC32 checksum of the file. The checksum itself is calculated in native
+code so larger chunks mean fewer round-trips to the worker thread of the file.
+"""
+
+_ALL_CUBIC_SEGMENT_FORMAT: int = 2 | (2 << 2) | (2 << 4)
+"""Format byte of a trajectory segment where all three axes are encoded as
+cubic Bezier curves.
+"""
+
 
 async def _read_exactly(
     fp,
@@ -51,6 +69,65 @@ async def _read_exactly(
     return data
 
 
+def _read_exactly_sync(
+    buffer: BytesIO,
+    length: int,
+    offset: int,
+    *,
+    message: str = "unexpected end of block in Skybrush file",
+) -> bytes:
+    with buffer.getbuffer() as view:
+        data = bytes(view[offset : offset + length])
+    if len(data) != length:
+        raise IOError(message)
+    return data
+
+
+class _SyncBytesIOAdapter:
+    """Adapter that provides the same async interface for an in-memory
+    BytesIO buffer as the wrapper returned by `trio.wrap_file()`, but without
+    dispatching each call to a worker thread. Operations on in-memory buffers
+    never block so there is no need to run them in a separate thread.
+    """
+
+    def __init__(self, buffer: BytesIO):
+        """Constructor.
+
+        Parameters:
+            buffer: the in-memory buffer to wrap
+        """
+        self._wrapped = buffer
+
+    @property
+    def wrapped(self) -> BytesIO:
+        """The wrapped in-memory buffer."""
+        return self._wrapped
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, tb):
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        self._wrapped.close()
+
+    async def read(self, size: Optional[int] = -1) -> bytes:
+        return self._wrapped.read(size)
+
+    async def seek(self, offset: int, whence: int = SEEK_SET) -> int:
+        return self._wrapped.seek(offset, whence)
+
+    def seekable(self) -> bool:
+        return self._wrapped.seekable()
+
+    async def tell(self) -> int:
+        return self._wrapped.tell()
+
+    async def write(self, data) -> int:
+        return self._wrapped.write(data)
+
+
 class SkybrushBinaryFormatBlockType(IntEnum):
     """Enum representing the possible block types in a Skybrush binary file."""
 
@@ -65,18 +142,62 @@ class SkybrushBinaryFormatBlockType(IntEnum):
 class SkybrushBinaryFileBlock:
     """Class representing a single block in a Skybrush binary file."""
 
+    _buffer: Optional[BytesIO]
+    """The in-memory buffer that the contents of the block should be read from
+    when it is not loaded yet; `None` if the block is not backed by an in-memory
+    buffer.
+    """
+
+    _contents: Optional[bytes]
+    """The contents of the block; `None` if it was not loaded yet."""
+
+    _fp: Any
+    """The async stream that the contents of the block should be read from
+    when it is not loaded yet; `None` if the block is not backed by a stream.
+    """
+
+    _length: int
+    """Length of the body of the block in the backing buffer or stream."""
+
+    _loader: Optional[Callable[[], Awaitable[bytes]]]
+    """Async function that resolves to the contents of the block; `None` if
+    the block is not backed by such a function.
+    """
+
+    _offset: Optional[int]
+    """Offset of the body of the block in the backing buffer or stream; `None`
+    if the body starts at the current position of the stream.
+    """
+
     def __init__(
         self,
         type: int,
-        contents: Union[Optional[bytes], Callable[[], Awaitable[bytes]]],
+        contents: Union[Optional[bytes], Callable[[], Awaitable[bytes]]] = None,
+        *,
+        fp: Any = None,
+        buffer: Optional[BytesIO] = None,
+        offset: Optional[int] = None,
+        length: int = 0,
     ):
         """Constructor.
 
+        At most one of `contents`, `fp` and `buffer` may be given.
+
         Parameters:
             type: type of the block
             contents: the contents of the block, or an async function that resolves
                 to the contents of the block when invoked with no arguments
+            fp: an async stream to read the contents of the block from lazily
+            buffer: an in-memory buffer to slice the contents of the block from
+                lazily, without going through the async stream interface
+            offset: the offset of the body of the block in `fp` or `buffer`;
+                `None` means that the body starts at the current position of
+                `fp` when the block is read. Must be given for `buffer`.
+            length: the length of the body of the block in `fp` or `buffer`
         """
+        if buffer is not None and offset is None:
+            raise ValueError("offset must be given for in-memory buffers")
+
         self.type = type
 
         if callable(contents):
@@ -86,20 +207,38 @@ class SkybrushBinaryFileBlock:
             self._loader = None
             self._contents = contents
 
+        self._fp = fp
+        self._buffer = buffer
+        self._offset = offset
+        self._length = length
+
     @property
     def consumed(self) -> bool:
         """Whether the block has already been consumed, i.e. loaded from the
         backing awaitable.
 
-        Returns True if the block was constructed without an awaitable.
+        Returns True if the block was constructed without an awaitable or a
+        backing buffer or stream.
         """
-        return self._loader is None
+        return self._loader is None and self._fp is None and self._buffer is None
 
     async def read(self) -> bytes:
         """Reads the raw body of this block."""
-        if self._contents is None and self._loader is not None:
-            self._contents = await self._loader()
-            self._loader = None
+        if self._contents is None:
+            if self._buffer is not None:
+                assert self._offset is not None
+                self._contents = _read_exactly_sync(
+                    self._buffer, self._length, self._offset
+                )
+                self._buffer = None
+            elif self._fp is not None:
+                self._contents = await _read_exactly(
+                    self._fp, self._length, offset=self._offset
+                )
+                self._fp = None
+            elif self._loader is not None:
+                self._contents = await self._loader()
+                self._loader = None
         return self._contents  # type: ignore
 
 
@@ -117,6 +256,11 @@ class SkybrushBinaryShowFile:
     file-like object.
     """
 
+    _buffer: Optional[BytesIO] = None
+    """The in-memory buffer backing the file, `None` if the file is not backed
+    by an in-memory buffer.
+    """
+
     _checksum_validated: bool = False
     """Whether the checksum of the file has already been validated."""
 
@@ -160,11 +304,14 @@ class SkybrushBinaryShowFile:
         Parameters:
             fp: the file-like object that stores the show data
         """
-        if isinstance(fp, BytesIO):
-            self._buffer = fp
+        self._buffer = fp if isinstance(fp, BytesIO) else None
 
         self._checksum_validated = False
-        self._fp = wrap_file(fp)
+        self._fp = (
+            _SyncBytesIOAdapter(self._buffer)
+            if self._buffer is not None
+            else wrap_file(fp)
+        )
         self._features = SkybrushBinaryFileFeatures.NONE
         self._version = None
         self._start_of_first_block = None
@@ -181,57 +328,96 @@ class SkybrushBinaryShowFile:
         object to the start of the first block in the file.
         """
         if self._start_of_first_block is None:
-            await self._fp.seek(0)
-
-            self._version = await self._expect_header()
-            if self._version == 1:
-                self._features = SkybrushBinaryFileFeatures.NONE
-            elif self._version == 2:
-                feature_flags = await self._fp.read(1)
-                self._features = SkybrushBinaryFileFeatures(feature_flags[0])
-            else:
-                raise RuntimeError("only version 1 files are supported")
-
-            if self._features & SkybrushBinaryFileFeatures.CRC32:
-                self._start_of_crc_bytes = await self._fp.tell()
-                await self._fp.read(4)
-            else:
-                self._start_of_crc_bytes = None
+            await self._read_header()
 
-            self._start_of_first_block = await self._fp.tell()
-        else:
-            await self._fp.seek(self._start_of_first_block)
+        await self._fp.seek(self._start_of_first_block)
 
-    async def _expect_header(self) -> int:
-        """Reads the beginning of the buffer to check whether the Skybrush binary
-        file header is to be found there. Throws a RuntimeError if the file
+    async def _read_header(self) -> None:
+        """Reads and parses the header of the Skybrush binary file from the
+        start of the underlying file-like object. The read/write pointer is
+        left at an unspecified position after the header.
+        """
+        # Read the longest possible header in one go; the parser figures out
+        # where the header actually ends
+        await self._fp.seek(0)
+        header = await self._fp.read(_SKYBRUSH_BINARY_FILE_MAX_HEADER_LENGTH)
+        self._parse_header(header)
+
+    def _parse_header(self, header: bytes) -> None:
+        """Parses the header of the Skybrush binary file and updates the
+        version number, the feature flags and the location of the CRC bytes
+        and the first block accordingly. Throws a RuntimeError if the file
         header is invalid.
 
-        Returns:
-            the Skybrush binary file schema version
+        Parameters:
+            header: the first few bytes of the file; must contain the entire
+                header but may also contain additional bytes after it
         """
-        header = await self._fp.read(4)
-        if header != _SKYBRUSH_BINARY_FILE_MARKER:
-            raise RuntimeError(f"expected Skybrush binary file header, got {header!r}")
+        marker = header[:4]
+        if marker != _SKYBRUSH_BINARY_FILE_MARKER:
+            raise RuntimeError(f"expected Skybrush binary file header, got {marker!r}")
+
+        if len(header) < 5:
+            raise RuntimeError("Skybrush binary file header is truncated")
+
+        version = header[4]
+        if version == 1:
+            features = SkybrushBinaryFileFeatures.NONE
+            header_length = 5
+        elif version == 2:
+            if len(header) < 6:
+                raise RuntimeError("Skybrush binary file header is truncated")
+            features = SkybrushBinaryFileFeatures(header[5])
+            header_length = 6
+        else:
+            raise RuntimeError("only version 1 files are supported")
 
-        version = await self._fp.read(1)
-        return ord(version)
+        if features & SkybrushBinaryFileFeatures.CRC32:
+            start_of_crc_bytes = header_length
+            header_length += 4
+            if len(header) < header_length:
+                raise RuntimeError("Skybrush binary file header is truncated")
+        else:
+            start_of_crc_bytes = None
 
-    async def add_block(self, type: SkybrushBinaryFormatBlockType, body: bytes) -> None:
-        """Adds a new block to the end of the Skybrush file."""
+        self._version = version
+        self._features = features
+        self._start_of_crc_bytes = start_of_crc_bytes
+        self._start_of_first_block = header_length
+
+    async def _add_block_from_buffer(
+        self, type: SkybrushBinaryFormatBlockType, buf: bytearray
+    ) -> None:
+        """Adds a new block to the end of the Skybrush file, given a buffer
+        that starts with space reserved for the block header, followed by the
+        body of the block. The header is filled in place so the body does not
+        need to be copied again.
+        """
         seekable = self._fp.seekable()
 
         if seekable:
             await self._fp.seek(0, SEEK_END)
 
-        if len(body) >= 65536:
+        header_size = self._header_struct.size
+        length = len(buf) - header_size
+        if length >= 65536:
             raise ValueError(
-                f"body too large; maximum allowed length is 65535 bytes, got {len(body)}"
+                f"body too large; maximum allowed length is 65535 bytes, got {length}"
             )
 
-        header = self._header_struct.pack(type, len(body))
-        await self._fp.write(header)
-        await self._fp.write(body)
+        self._header_struct.pack_into(buf, 0, type, length)
+        await self._fp.write(buf)
+
+    async def add_block(
+        self, type: SkybrushBinaryFormatBlockType, body: Union[bytes, bytearray]
+    ) -> None:
+        """Adds a new block to the end of the Skybrush file."""
+        # Assemble the header and the body in a single buffer so we need only
+        # one write
+        header_size = self._header_struct.size
+        buf = bytearray(header_size + len(body))
+        buf[header_size:] = body
+        await self._add_block_from_buffer(type, buf)
 
     async def add_comment(
         self, comment: Union[str, bytes], encoding: str = "utf-8"
@@ -287,17 +473,21 @@ class SkybrushBinaryShowFile:
                 "Trajectory covers too large an area for a Skybrush binary show file"
             )
 
-        chunks = [bytes([scaling_factor])]  # MSB is reserved as zero
+        # Reserve space for the block header in front of the body so we can
+        # encode the segments directly into the buffer that we will write
+        header_size = self._header_struct.size
+        buf = bytearray(header_size + 1)
+        buf[header_size] = scaling_factor  # MSB is reserved as zero
         encoder = SegmentEncoder(scaling_factor)
 
         # .skyb files need absolute timestamps so we need to add a constant
         # segment in front if the takeoff time is nonzero; that's why we have
         # absolute=True here
         segments = trajectory.iter_segments(max_length=65, absolute=True)
-        chunks.extend(encoder.iter_encode_multiple_segments(segments))
+        encoder.encode_multiple_segments_into(buf, segments)
 
-        return await self.add_block(
-            SkybrushBinaryFormatBlockType.TRAJECTORY, b"".join(chunks)
+        return await self._add_block_from_buffer(
+            SkybrushBinaryFormatBlockType.TRAJECTORY, buf
         )
 
     async def add_encoded_yaw_setpoints(self, data: bytes) -> None:
@@ -336,8 +526,11 @@ class SkybrushBinaryShowFile:
         if validate:
             await self.validate_checksum()
 
+        header_size = self._header_struct.size
+        pos: int = await self._fp.tell() if seekable else 0
+
         while True:
-            data = await self._fp.read(self._header_struct.size)
+            data = await self._fp.read(header_size)
             if not data:
                 # End of stream
                 break
@@ -345,18 +538,22 @@ class SkybrushBinaryShowFile:
             block_type, length = self._header_struct.unpack(data)
 
             if seekable:
-                offset = await self._fp.tell()
-                reader = partial(_read_exactly, self._fp, length, offset=offset)
-            else:
-                reader = partial(_read_exactly, self._fp, length)
-
-            block = SkybrushBinaryFileBlock(block_type, reader)
-            if seekable:
-                end_of_block = await self._fp.tell()
-                end_of_block += length
+                # Keep track of the position of the stream ourselves instead
+                # of asking the stream after each block
+                pos += header_size
+                if self._buffer is not None:
+                    block = SkybrushBinaryFileBlock(
+                        block_type, buffer=self._buffer, offset=pos, length=length
+                    )
+                else:
+                    block = SkybrushBinaryFileBlock(
+                        block_type, fp=self._fp, offset=pos, length=length
+                    )
+                pos += length
                 yield block
-                await self._fp.seek(end_of_block)
+                await self._fp.seek(pos)
             else:
+                block = SkybrushBinaryFileBlock(block_type, fp=self._fp, length=length)
                 yield block
                 if not block.consumed:
                     await block.read()
@@ -370,15 +567,17 @@ class SkybrushBinaryShowFile:
 
     async def finalize(self) -> None:
         """Finalizes the file by updating its CRC block (if any)."""
-        if not self._version:
+        if self._version is None:
             if not self._fp.seekable():
                 raise RuntimeError(
                     "version number not known yet and the binary show file is not seekable"
                 )
 
+            # No need to rewind to the first block here as we restore the
+            # original position anyway
             pos = await self._fp.tell()
             try:
-                await self._rewind()
+                await self._read_header()
             finally:
                 await self._fp.seek(pos)
 
@@ -388,7 +587,7 @@ class SkybrushBinaryShowFile:
         """Returns the underlying buffer of the file if it is backed by an
         in-memory buffer.
         """
-        if self._buffer:
+        if self._buffer is not None:
             return self._buffer
 
         raise RuntimeError("file is not backed by an in-memory buffer")
@@ -401,7 +600,7 @@ class SkybrushBinaryShowFile:
             finalize: whether to finalize the contents before returning the
                 result
         """
-        if not self._buffer:
+        if self._buffer is None:
             raise RuntimeError("file is not backed by an in-memory buffer")
         return self._buffer.getvalue()
 
@@ -444,12 +643,18 @@ class SkybrushBinaryShowFile:
 
         assert self._start_of_crc_bytes is not None
 
-        position: int = await self._fp.tell()
-        try:
-            await self._fp.seek(self._start_of_crc_bytes)
-            observed_crc: bytes = await _read_exactly(self._fp, 4)
-        finally:
-            await self._fp.seek(position)
+        start = self._start_of_crc_bytes
+        if self._buffer is not None:
+            # Fast path: take the CRC bytes directly from the in-memory buffer
+            with self._buffer.getbuffer() as view:
+                observed_crc: bytes = bytes(view[start : start + 4])
+        else:
+            position: int = await self._fp.tell()
+            try:
+                await self._fp.seek(start)
+                observed_crc = await _read_exactly(self._fp, 4)
+            finally:
+                await self._fp.seek(position)
 
         if observed_crc != expected_crc:
             expected = expected_crc.hex()
@@ -478,6 +683,11 @@ class SkybrushBinaryShowFile:
 
         assert self._start_of_crc_bytes is not None
 
+        if self._buffer is not None:
+            # Fast path: calculate the checksum directly on the in-memory
+            # buffer, without copying it or going through the async wrapper
+            return self._get_expected_crc32_of_buffer(self._buffer)
+
         position: int = await self._fp.tell()
         try:
             expected_crc = 0
@@ -489,16 +699,33 @@ class SkybrushBinaryShowFile:
             expected_crc = crc32(b"\x00\x00\x00\x00", expected_crc)
 
             while True:
-                block = await self._fp.read(4096)
+                block = await self._fp.read(_CRC_CHUNK_SIZE)
                 if block:
                     expected_crc = crc32(block, expected_crc)
-                if len(block) < 4096:
+                if len(block) < _CRC_CHUNK_SIZE:
                     break
         finally:
             await self._fp.seek(position)
 
         return expected_crc.to_bytes(4, "little", signed=False)
 
+    def _get_expected_crc32_of_buffer(self, buffer: BytesIO) -> bytes:
+        """Returns the expected CRC32 checksum of the file, assuming that it is
+        backed by the given in-memory buffer.
+
+        The buffer is not copied; the checksum is calculated on a memoryview
+        of the buffer, with the CRC bytes in the header replaced by zeros.
+        """
+        assert self._start_of_crc_bytes is not None
+
+        start = self._start_of_crc_bytes
+        with buffer.getbuffer() as view:
+            expected_crc = crc32(view[:start], 0)
+            expected_crc = crc32(b"\x00\x00\x00\x00", expected_crc)
+            expected_crc = crc32(view[start + 4 :], expected_crc)
+
+        return expected_crc.to_bytes(4, "little", signed=False)
+
     async def _update_crc32(self) -> None:
         """Updates the CRC32 checksum of the file if it has one."""
         if not self.features & SkybrushBinaryFileFeatures.CRC32:
@@ -523,6 +750,12 @@ class SegmentEncoder:
 
     _point_struct: ClassVar[Struct] = Struct("<hhhh")
     _header_struct: ClassVar[Struct] = Struct("<BH")
+    _coordinate_structs: ClassVar[dict[int, Struct]] = {
+        1: Struct("<h"),
+        3: Struct("<3h"),
+        7: Struct("<7h"),
+    }
+    _cubic_segment_struct: ClassVar[Struct] = Struct("<BH9h")
 
     _scale: float
 
@@ -554,6 +787,19 @@ class SegmentEncoder:
         yaw = self._scale_yaw(yaw)
         return self._point_struct.pack(x, y, z, yaw)
 
+    def encode_point_into(self, buf: bytearray, point: Point, yaw: float = 0.0) -> None:
+        """Encodes the X, Y and Z coordinates of a point, followed by the given
+        yaw coordinate, and appends the result to the given buffer.
+
+        Args:
+            buf: the buffer to append the encoded representation to
+            point: the point to encode
+            yaw: an optional yaw value to encode. Currently ignored; we have
+                migrated to using separate yaw control blocks.
+        """
+        x, y, z = self._scale_point(point)
+        buf += self._point_struct.pack(x, y, z, self._scale_yaw(yaw))
+
     def encode_segment(self, segment: TrajectorySegment) -> bytes:
         """Encodes the control points and the end point of the given segment.
 
@@ -568,32 +814,28 @@ class SegmentEncoder:
             the encoded representation of the control points and the end point
             of the segment
         """
-        if not segment.has_control_points:
-            # This is easier
-            pass
+        buf = bytearray()
+        self.encode_segment_into(buf, segment)
+        return bytes(buf)
 
-        duration = floor(segment.duration * 1000)
-        if duration < 0 or duration > 65535:
-            raise RuntimeError(
-                f"trajectory segment must be in the range 0-65535 msec, got {duration} msec"
-            )
+    def encode_segment_into(self, buf: bytearray, segment: TrajectorySegment) -> None:
+        """Encodes the control points and the end point of the given segment
+        and appends the result to the given buffer.
 
-        xs, ys, zs = zip(*(self._scale_point(point) for point in segment.points))
-        x_format, xs = self._encode_coordinate_series(xs)
-        y_format, ys = self._encode_coordinate_series(ys)
-        z_format, zs = self._encode_coordinate_series(zs)
+        Note that the start point of the segment is assumed to be identical to
+        the end point of the previous segment, therefore the start point will
+        not be encoded.
 
-        header = self._header_struct.pack(
-            x_format | (y_format << 2) | (z_format << 4), duration
+        Args:
+            buf: the buffer to append the encoded representation to
+            segment: the segment to encode
+        """
+        scale = self._scale_coordinates
+        xs, ys, zs = zip(*segment.points)
+        self._encode_scaled_segment_into(
+            buf, segment.duration, scale(xs), scale(ys), scale(zs)
         )
 
-        parts = [header]
-        parts.extend(xs)
-        parts.extend(ys)
-        parts.extend(zs)
-
-        return b"".join(parts)
-
     def encode_multiple_segments(self, segments: Iterable[TrajectorySegment]) -> bytes:
         """Encodes the start point, the control points and the end point of multiple
         segments that constitute a continuous curve.
@@ -608,7 +850,51 @@ class SegmentEncoder:
         Returns:
             the encoded representation of the segments
         """
-        return b"".join(self.iter_encode_multiple_segments(segments))
+        buf = bytearray()
+        self.encode_multiple_segments_into(buf, segments)
+        return bytes(buf)
+
+    def encode_multiple_segments_into(
+        self, buf: bytearray, segments: Iterable[TrajectorySegment]
+    ) -> None:
+        """Encodes the start point, the control points and the end point of multiple
+        segments that constitute a continuous curve, and appends the result to
+        the given buffer.
+
+        It is assumed that the start point of each segment is identical to the
+        end point of the previous segment, therefore we will only encode the
+        start point of the first segment.
+
+        Args:
+            buf: the buffer to append the encoded representation to
+            segments: the segments to encode
+        """
+        segments = list(segments)
+        if not segments:
+            return
+
+        # Scale the coordinates of all the points of all the segments in one
+        # go, axis by axis, instead of scaling each segment separately
+        points = [point for segment in segments for point in segment.points]
+        xs, ys, zs = (self._scale_coordinates(axis) for axis in zip(*points))
+
+        # Encode the start point of the trajectory
+        self.encode_point_into(buf, segments[0].start)
+
+        # Encode each segment without its start point. Trajectories consisting
+        # of cubic Bezier segments only are common enough to deserve a
+        # specialized loop
+        if all(len(segment.points) == 4 for segment in segments):
+            self._encode_scaled_cubic_segments_into(buf, segments, xs, ys, zs)
+            return
+
+        start = 0
+        for segment in segments:
+            end = start + len(segment.points)
+            self._encode_scaled_segment_into(
+                buf, segment.duration, xs[start:end], ys[start:end], zs[start:end]
+            )
+            start = end
 
     def iter_encode_multiple_segments(
         self,
@@ -640,11 +926,13 @@ class SegmentEncoder:
             # Encode the segment without its start point
             yield self.encode_segment(segment)
 
-    def _encode_coordinate_series(self, xs: Sequence[int]) -> tuple[int, list[bytes]]:
-        first, *xs = xs
-        if all(x == first for x in xs):
+    def _encode_coordinate_series(self, xs: Sequence[int]) -> tuple[int, bytes]:
+        first = xs[0]
+        if xs.count(first) == len(xs):
             # segment is constant, this is easy
-            return 0, [b""]
+            return 0, b""
+
+        xs = xs[1:]
 
         if len(xs) == 2:
             # segment is a quadratic Bezier curve, we need to promote it to
@@ -652,22 +940,121 @@ class SegmentEncoder:
             xs_float = ((first + 2 * xs[0]) / 3, (2 * xs[0] + xs[1]) / 3, xs[1])
             xs = [int(round(x)) for x in xs_float]
 
-        coords = [x.to_bytes(2, byteorder="little", signed=True) for x in xs]
         if len(xs) == 1:
             # segment is linear
-            return 1, coords
+            return 1, self._coordinate_structs[1].pack(*xs)
 
         if len(xs) == 3:
             # segment is a cubic Bezier curve
-            return 2, coords
+            return 2, self._coordinate_structs[3].pack(*xs)
 
         if len(xs) == 7:
             # segment is a 7D polynomial curve
-            return 3, coords
+            return 3, self._coordinate_structs[7].pack(*xs)
 
         # TODO(ntamas): convert 4-5-6D curves to 7D ones
         raise NotImplementedError(f"{len(xs)}D curves not implemented yet")
 
+    def _encode_scaled_cubic_segments_into(
+        self,
+        buf: bytearray,
+        segments: Sequence[TrajectorySegment],
+        xs: Sequence[int],
+        ys: Sequence[int],
+        zs: Sequence[int],
+    ) -> None:
+        """Specialized variant of the segment encoding loop in
+        `encode_multiple_segments_into()` for the case when each segment has
+        exactly four points (i.e. it is a cubic Bezier curve). The scaled
+        coordinates of the points of all the segments must be given in the
+        coordinate series, including the start points.
+        """
+        for start, segment in zip(range(0, len(xs), 4), segments):
+            end = start + 4
+            sx, sy, sz = xs[start:end], ys[start:end], zs[start:end]
+            duration = self._scale_duration(segment.duration)
+            if not self._pack_cubic_segment_into(buf, duration, sx, sy, sz):
+                self._pack_segment_into(buf, duration, sx, sy, sz)
+
+    def _encode_scaled_segment_into(
+        self,
+        buf: bytearray,
+        duration: float,
+        xs: Sequence[int],
+        ys: Sequence[int],
+        zs: Sequence[int],
+    ) -> None:
+        """Encodes a segment with the given duration and the given scaled
+        coordinates of its points, and appends the result to the given buffer.
+        The start point of the segment must be included in the coordinate
+        series but it will not be encoded.
+        """
+        duration_msec = self._scale_duration(duration)
+        if len(xs) != 4 or not self._pack_cubic_segment_into(
+            buf, duration_msec, xs, ys, zs
+        ):
+            self._pack_segment_into(buf, duration_msec, xs, ys, zs)
+
+    def _pack_cubic_segment_into(
+        self,
+        buf: bytearray,
+        duration: int,
+        xs: Sequence[int],
+        ys: Sequence[int],
+        zs: Sequence[int],
+    ) -> bool:
+        """Fast path for the most common case of encoding a segment with four
+        points. When all three axes are non-constant cubic Bezier curves, the
+        layout of the segment is fixed so we can pack it with a single call.
+
+        Returns:
+            whether the segment was packed; `False` if some axes are constant,
+            in which case nothing is appended to the buffer
+        """
+        if xs.count(xs[0]) < 4 and ys.count(ys[0]) < 4 and zs.count(zs[0]) < 4:
+            buf += self._cubic_segment_struct.pack(
+                _ALL_CUBIC_SEGMENT_FORMAT, duration, *xs[1:], *ys[1:], *zs[1:]
+            )
+            return True
+        else:
+            return False
+
+    def _pack_segment_into(
+        self,
+        buf: bytearray,
+        duration: int,
+        xs: Sequence[int],
+        ys: Sequence[int],
+        zs: Sequence[int],
+    ) -> None:
+        """Generic implementation of encoding a segment with the given duration
+        in milliseconds and the given scaled coordinates of its points.
+        """
+        x_format, xs = self._encode_coordinate_series(xs)
+        y_format, ys = self._encode_coordinate_series(ys)
+        z_format, zs = self._encode_coordinate_series(zs)
+
+        buf += self._header_struct.pack(
+            x_format | (y_format << 2) | (z_format << 4), duration
+        )
+        buf += xs
+        buf += ys
+        buf += zs
+
+    def _scale_coordinates(self, values: Iterable[float]) -> list[int]:
+        # Same as _scale_point(), but scales a series of coordinates along the
+        # same axis in one go. See _scale_point() for why we need int() here.
+        scale = self._scale
+        return [int(value * scale) for value in values]
+
+    def _scale_duration(self, duration: float) -> int:
+        duration_msec = floor(duration * 1000)
+        if duration_msec < 0 or duration_msec > 65535:
+            raise RuntimeError(
+                f"trajectory segment must be in the range 0-65535 msec, got {duration_msec} msec"
+            )
+        return duration_msec
+
     def _scale_point(self, point: Point) -> tuple[int, int, int]:
         # We always need to round with int() here, we cannot use round(). The
         # reason is that the scaling factor was determined in a way that it is
@@ -1,5 +1,5 @@
-from crcmod import mkCrcFun as make_crc_function
 from typing import Optional, Sequence
+from zlib import crc32 as _zlib_crc32
 
 __all__ = (
     "BoundingBoxCalculator",
@@ -93,7 +93,22 @@ def encode_variable_length_integer(value: int) -> bytes:
             return bytes(data)
 
 
-crc32_mavftp = make_crc_function(0x104C11DB7, initCrc=0, rev=True, xorOut=0)
-"""CRC32 function used by ArduPilot's MAVFTP implementation and the Skybrush
-binary file format.
-"""
+def crc32_mavftp(data: bytes, crc: int = 0) -> int:
+    """CRC32 function used by ArduPilot's MAVFTP implementation and the Skybrush
+    binary file format.
+
+    The checksum uses the same (reflected) polynomial as the standard CRC32
+    function in zlib, but with no initial value and no final XOR. We delegate
+    to zlib's native implementation and undo its pre- and post-inversion of
+    the CRC register.
+
+    Parameters:
+        data: the data to calculate the checksum of; any object supporting
+            the buffer protocol is accepted
+        crc: the CRC value of the data preceding this chunk, used when
+            calculating the checksum incrementally
+
+    Returns:
+        the updated CRC value
+    """
+    return _zlib_crc32(data, crc ^ 0xFFFFFFFF) ^ 0xFFFFFFFF
@@ -6,7 +6,10 @@ from flockwave.server.show.formats import (
     SkybrushBinaryShowFile,
     SkybrushBinaryFormatBlockType,
 )
-from flockwave.server.show.trajectory import TrajectorySegment
+from flockwave.server.show.trajectory import (
+    TrajectorySegment,
+    TrajectorySpecification,
+)
 
 
 SIMPLE_SKYB_FILE_V1 = (
@@ -144,6 +147,55 @@ class TestSegmentEncoder:
             b" \x88\x13 N\x00\x00\x00\x00"
         )
 
+    def test_encode_multiple_cubic_segments(self):
+        encoder = SegmentEncoder()
+        segments = [
+            TrajectorySegment(
+                t=0,
+                duration=5,
+                points=[(0, 0, 0), (1, 2, 3), (4, 5, 6), (7, 8, 9)],
+            ),
+            TrajectorySegment(
+                t=5,
+                duration=2,
+                points=[(7, 8, 9), (6, 6, 6), (3, 2, 1), (0, 0, 0)],
+            ),
+        ]
+
+        assert encoder.encode_multiple_segments(segments) == (
+            # Start point: (0, 0, 0), yaw = 0
+            b"\x00\x00\x00\x00\x00\x00\x00\x00"
+            # First segment: cubic Bezier, changing in XYZ
+            b"*\x88\x13\xe8\x03\xa0\x0fX\x1b\xd0\x07\x88\x13@\x1f\xb8\x0bp\x17(#"
+            # Second segment: cubic Bezier, changing in XYZ
+            b"*\xd0\x07p\x17\xb8\x0b\x00\x00p\x17\xd0\x07\x00\x00p\x17\xe8\x03\x00\x00"
+        )
+
+    def test_encode_multiple_mixed_segments(self):
+        encoder = SegmentEncoder()
+        segments = [
+            TrajectorySegment(t=0, duration=5, points=[(0, 0, 0), (2, 4, 6)]),
+            TrajectorySegment(
+                t=5, duration=3, points=[(2, 4, 6), (5, 5, 5), (8, 2, 6)]
+            ),
+            TrajectorySegment(
+                t=8,
+                duration=2,
+                points=[(8, 2, 6), (8, 3, 6), (8, 4, 6), (8, 5, 6)],
+            ),
+        ]
+
+        assert encoder.encode_multiple_segments(segments) == (
+            # Start point: (0, 0, 0), yaw = 0
+            b"\x00\x00\x00\x00\x00\x00\x00\x00"
+            # First segment: linear, changing in XYZ
+            b"\x15\x88\x13\xd0\x07\xa0\x0fp\x17"
+            # Second segment: quadratic Bezier, promoted to cubic, changing in XYZ
+            b"*\xb8\x0b\xa0\x0fp\x17@\x1f;\x12\xa0\x0f\xd0\x07\xd5\x14\xd5\x14p\x17"
+            # Third segment: cubic Bezier, changing in Y only
+            b"\x08\xd0\x07\xb8\x0b\xa0\x0f\x88\x13"
+        )
+
 
 class TestSkybrushBinaryFileFormat:
     async def test_reading_blocks_version_1(self):
@@ -196,6 +248,23 @@ class TestSkybrushBinaryFileFormat:
             async with SkybrushBinaryShowFile.from_bytes(data) as f:
                 await f.read_all_blocks()
 
+    async def test_reading_blocks_version_2_from_file(self, tmp_path):
+        path = tmp_path / "show.skyb"
+        path.write_bytes(SIMPLE_SKYB_FILE_V2)
+
+        with path.open("rb") as fp:
+            async with SkybrushBinaryShowFile(fp) as f:
+                blocks = await f.read_all_blocks()
+                assert len(blocks) == 3
+                assert await blocks[1].read() == b"this is a test file"
+
+        path.write_bytes(SIMPLE_SKYB_FILE_V2[:6] + b"\x00" + SIMPLE_SKYB_FILE_V2[7:])
+
+        with path.open("rb") as fp:
+            with raises(RuntimeError, match="CRC error"):
+                async with SkybrushBinaryShowFile(fp) as f:
+                    await f.read_all_blocks()
+
     async def test_adding_blocks_version_1(self):
         async with SkybrushBinaryShowFile.create_in_memory(version=1) as f:
             await f.add_block(
@@ -224,6 +293,58 @@ class TestSkybrushBinaryFileFormat:
             await f.finalize()
             assert f.get_contents() == SIMPLE_SKYB_FILE_V2
 
+    async def test_adding_trajectory(self):
+        trajectory = TrajectorySpecification(
+            {
+                "version": 1,
+                "takeoffTime": 2,
+                "points": [
+                    [0, [0, 0, 0], []],
+                    [5, [10, 0, 5], []],
+                    [8, [10, 10, 5], [[10, 3, 5], [10, 7, 5]]],
+                    [10, [0, 10, 7], [[5, 12, 6]]],
+                    [80, [0, 10, 0], []],
+                ],
+            }
+        )
+        async with SkybrushBinaryShowFile.create_in_memory() as f:
+            await f.add_trajectory(trajectory)
+            await f.finalize()
+            assert f.get_contents() == (
+                # Header, version 2, feature flags and checksum
+                b"skyb\x02\x01\xb2\xfc\xe7n"
+                # Trajectory block header, scaling factor, start point
+                b"\x01;\x00\x01\x00\x00\x00\x00\x00\x00\x00\x00"
+                # Constant segment before takeoff
+                b"\x00\xd0\x07"
+                # Linear segment along X and Z
+                b"\x11\x88\x13\x10'\x88\x13"
+                # Cubic Bezier segment along Y only
+                b"\x08\xb8\x0b\xb8\x0bX\x1b\x10'"
+                # Quadratic Bezier segment, promoted to cubic along XYZ
+                b"*\xd0\x07\x0b\x1a\x05\r\x00\x00E,E,\x10'#\x16\xbd\x18X\x1b"
+                # Linear segment along Z, split into two as it is too long
+                b"\x10\xb8\x88\xac\r\x10\xb8\x88\x00\x00"
+            )
+
+    async def test_adding_trajectory_with_multiple_errors(self):
+        # The 4D curve in the second keyframe cannot be encoded, but segments
+        # are collected before encoding them so the error in the third
+        # keyframe is reported first
+        trajectory = TrajectorySpecification(
+            {
+                "version": 1,
+                "points": [
+                    [0, [0, 0, 0], []],
+                    [5, [10, 10, 10], [[1, 2, 3], [4, 5, 6], [7, 8, 9]]],
+                    [5, [20, 20, 20], []],
+                ],
+            }
+        )
+        async with SkybrushBinaryShowFile.create_in_memory() as f:
+            with raises(ValueError, match="time should not stand still"):
+                await f.add_trajectory(trajectory)
+
     async def test_adding_block_that_is_too_large(self):
         async with SkybrushBinaryShowFile.create_in_memory() as f:
             with raises(ValueError, match="body too large"):
@@ -241,3 +362,16 @@ class TestSkybrushBinaryFileFormat:
         with raises(RuntimeError, match="version"):
             async with SkybrushBinaryShowFile.from_bytes(b"skyb\xff") as f:
                 await f.read_all_blocks()
+
+    async def test_truncated_header(self):
+        for data in (b"skyb", b"skyb\x02", b"skyb\x02\x01\x00\x00"):
+            with raises(RuntimeError, match="truncated"):
+                async with SkybrushBinaryShowFile.from_bytes(data) as f:
+                    await f.read_all_blocks()
+
+    async def test_truncated_block(self):
+        async with SkybrushBinaryShowFile.from_bytes(SIMPLE_SKYB_FILE_V1[:-5]) as f:
+            blocks = await f.read_all_blocks()
+            assert len(blocks) == 2
+            with raises(IOError, match="unexpected end of block"):
+                await blocks[1].read()
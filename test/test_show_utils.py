@@ -63,3 +63,19 @@ def test_crc32_mavftp():
     assert crc32_mavftp(data, 0) == int.from_bytes(
         b"\xab\x5c\x53\x8a", "little", signed=False
     )
+
+
+def test_crc32_mavftp_incremental():
+    data = bytes(range(256)) * 37
+
+    # Check value for the standard "123456789" input; the MAVFTP variant has
+    # no initial value and no final XOR
+    assert crc32_mavftp(b"123456789") == 0x2DFD2D88
+
+    expected = crc32_mavftp(data, 0)
+    for split in (0, 1, 7, 4096, len(data) - 1, len(data)):
+        crc = crc32_mavftp(data[:split], 0)
+        assert crc32_mavftp(data[split:], crc) == expected
+
+    assert crc32_mavftp(memoryview(data), 0) == expected
+    assert crc32_mavftp(bytearray(data), 0) == expected